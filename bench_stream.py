@@ -0,0 +1,116 @@
+"""Benchmark: plain pyte.Stream vs FastStream/FastScreen on Claude-like output.
+
+Usage: python3 bench_stream.py [lines]
+"""
+import random
+import sys
+import time
+
+import pyte
+
+from telebot import FastScreen, FastStream, SCREEN_COLS, SCREEN_ROWS
+
+ESC = "\x1b"
+
+CODE_LINES = [
+    "def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):",
+    "    if update.effective_user.id != ALLOWED_USER_ID: return",
+    "    message = update.message or update.edited_message",
+    "    # Send the text and then the Enter key separately",
+    "    await write_to_claude(message.text)",
+    "",
+    "for row in screen.display:",
+    "    print(row.rstrip())",
+]
+
+PROSE_LINES = [
+    "I'll read the file first to understand how the output is streamed.",
+    "The read loop decodes each chunk and feeds it into the virtual screen, "
+    "which is the hot path when large files are printed.",
+    "Los cambios están listos: revisé la configuración y añadí pruebas.",
+    "已完成修改，请查看差异。",
+    "Café with a combining accent: café and naïve résumé.",
+    "Done ✅ — 3 files changed, 42 insertions(+), 7 deletions(-) 🎉",
+]
+
+
+def build_transcript(lines=2000, seed=0):
+    """Builds a synthetic transcript resembling Claude Code's TUI output."""
+    rng = random.Random(seed)
+    out = [
+        ESC + "]0;✳ Claude Code" + "\x07",
+        ESC + "[?25l" + ESC + "[?2004h" + ESC + "[2J" + ESC + "[H",
+        ESC + "[38;5;174m╭" + "─" * (SCREEN_COLS - 2) + "╮" + ESC + "[39m\r\n",
+        ESC + "[38;5;174m│" + ESC + "[39m ✻ Welcome to Claude Code!" + "\r\n",
+        ESC + "[38;5;174m╰" + "─" * (SCREEN_COLS - 2) + "╯" + ESC + "[39m\r\n",
+    ]
+    spinner = "·✢✳✶✻✽"
+    for i in range(lines):
+        kind = rng.random()
+        if kind < 0.45:
+            line = rng.choice(CODE_LINES)
+            out.append(ESC + "[2m%5d" % (i + 1) + ESC + "[22m\t")
+            for word in line.split(" "):
+                color = rng.choice(["", ESC + "[34m", ESC + "[1;33m", ESC + "[38;2;120;200;80m"])
+                out.append(color + word + ESC + "[0m ")
+            out.append("\r\n")
+        elif kind < 0.75:
+            out.append(rng.choice(PROSE_LINES) + "\r\n")
+        elif kind < 0.85:
+            # Long line that wraps over several rows
+            out.append(ESC + "[36m" + "x" * rng.randint(SCREEN_COLS, SCREEN_COLS * 3) + ESC + "[m\r\n")
+        elif kind < 0.95:
+            # Spinner redraw in place
+            out.append(ESC + "[1A" + ESC + "[2K\r" + ESC + "[38;5;174m" + rng.choice(spinner)
+                       + ESC + "[39m Thinking… (%ds · esc to interrupt)\r\n" % i)
+        else:
+            out.append(rng.choice([
+                ESC + "[4h" + "inserted" + ESC + "[4l\r\n",
+                ESC + "[?7l" + "y" * (SCREEN_COLS + 10) + ESC + "[?7h\r\n",
+                ESC + "[5;20r" + ESC + "[20;1Hscroll region\r\n" + ESC + "[r",
+                ESC + "[10;40H" + ESC + "[7mrev" + ESC + "[27m" + ESC + "[1P\x08\x08X\r\n",
+                ESC + "(0lqqk" + ESC + "(B plain\r\n",
+                "zero​width stops the draw\r\n",
+                ESC + "7" + ESC + "[3;3H" + "saved" + ESC + "8" + "\r\n",
+                ESC + "]2;title\x07" + ESC + "[3X" + ESC + "[2@\r\n",
+            ]))
+    out.append(ESC + "[?25h")
+    return "".join(out)
+
+
+def split_chunks(text, seed=0, max_size=1024):
+    """Splits text into random sized chunks, like successive PTY reads."""
+    rng = random.Random(seed)
+    chunks = []
+    offset = 0
+    while offset < len(text):
+        size = rng.randint(1, max_size)
+        chunks.append(text[offset:offset + size])
+        offset += size
+    return chunks
+
+
+def run(screen_cls, stream_cls, chunks):
+    screen = screen_cls(SCREEN_COLS, SCREEN_ROWS)
+    stream = stream_cls(screen)
+    start = time.perf_counter()
+    for chunk in chunks:
+        stream.feed(chunk)
+    return time.perf_counter() - start
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    chunks = split_chunks(build_transcript(lines))
+    size = sum(len(c) for c in chunks)
+    print(f"Transcript: {lines} lines, {size / 1024:.0f} KiB in {len(chunks)} chunks")
+
+    baseline = min(run(pyte.Screen, pyte.Stream, chunks) for _ in range(3))
+    fast = min(run(FastScreen, FastStream, chunks) for _ in range(3))
+    print(f"pyte.Stream: {baseline:.3f}s ({size / baseline / 1048576:.2f} MiB/s)")
+    print(f"FastStream:  {fast:.3f}s ({size / fast / 1048576:.2f} MiB/s)")
+    print(f"Speedup:     {baseline / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
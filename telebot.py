@@ -7,7 +7,17 @@ import time
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 import pyte
+from pyte import modes as mo
+from pyte.charsets import LAT1_MAP
+from wcwidth import wcwidth
+import unicodedata
+import re
 import html
+import gzip
+import codecs
+import shutil
+import tempfile
+import httpx
 from dotenv import load_dotenv
 import locale
 
@@ -29,6 +39,16 @@ if not TELEGRAM_TOKEN or ALLOWED_USER_ID == 0:
 # Command to execute claude
 CLAUDE_COMMAND = ["claude"]
 
+# Working directory for the Claude session (uploads are saved here, /get reads from here)
+WORK_DIR = os.path.abspath(os.getenv("CLAUDE_WORK_DIR", os.getcwd()))
+UPLOAD_SUBDIR = "telegram_uploads"
+
+# File transfer limits (Telegram bots can download up to 20MB and upload up to 50MB)
+MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+MAX_DOWNLOAD_SIZE = 50 * 1024 * 1024
+COMPRESS_THRESHOLD = 1024 * 1024  # Text files larger than this are sent gzipped
+CHUNK_SIZE = 64 * 1024
+
 # Virtual screen configuration (cols, rows)
 SCREEN_COLS = 120
 SCREEN_ROWS = 40
@@ -38,12 +58,153 @@ DEBOUNCE_TIME = 1.0  # For streaming mode
 IDLE_TIME_THRESHOLD = 3.0 # Idle time to consider finished (smart mode)
 MAX_WAIT_TIME = 5.0  # Max wait time before sending in streaming mode
 
+# --- TERMINAL EMULATION ---
+
+# Unicode blocks common in Claude's output (latin text, punctuation, arrows,
+# box drawing, dingbats). Only single-cell, non-combining characters are kept.
+NARROW_RANGES = [(0x20, 0x7e), (0xa0, 0x17f), (0x2010, 0x2027), (0x2190, 0x21ff),
+                 (0x2300, 0x23ff), (0x2500, 0x25ff), (0x2700, 0x27bf)]
+
+def narrow_run_pattern():
+    """Builds a regex matching runs of characters that occupy exactly one cell."""
+    spans = []
+    for start, end in NARROW_RANGES:
+        for code in range(start, end + 1):
+            char = chr(code)
+            if wcwidth(char) != 1 or unicodedata.combining(char):
+                continue
+            if spans and spans[-1][1] == code - 1:
+                spans[-1][1] = code
+            else:
+                spans.append([code, code])
+    char_class = "".join(f"{re.escape(chr(a))}-{re.escape(chr(b))}" for a, b in spans)
+    return re.compile(f"[{char_class}]+")
+
+class FastScreen(pyte.Screen):
+    """pyte.Screen that writes runs of single-cell characters into the buffer in batches.
+
+    Anything else (wide, combining or unprintable characters, insert mode,
+    no autowrap, graphic charsets) goes through pyte's per-character draw,
+    so the resulting screen state is identical.
+    """
+    _narrow_run = narrow_run_pattern()
+
+    def __init__(self, columns: int, lines: int) -> None:
+        self._cells = {}  # attrs -> {char: Char}, shared across draws
+        super().__init__(columns, lines)
+
+    def draw(self, data: str) -> None:
+        charset = self.g1_charset if self.charset else self.g0_charset
+        if (mo.IRM in self.mode or mo.DECAWM not in self.mode
+                or charset is not LAT1_MAP or self.cursor.x > self.columns):
+            return super().draw(data)
+
+        offset = 0
+        for match in self._narrow_run.finditer(data):
+            start, end = match.span()
+            if start > offset:
+                segment = data[offset:start]
+                if any(self._stops_draw(char) for char in segment):
+                    # pyte stops drawing at the first unprintable character
+                    return super().draw(data[offset:])
+                super().draw(segment)
+            self._draw_narrow(data[start:end])
+            offset = end
+        if offset < len(data):
+            super().draw(data[offset:])
+
+    @staticmethod
+    def _stops_draw(char: str) -> bool:
+        width = wcwidth(char)
+        return width < 0 or (width == 0 and not unicodedata.combining(char))
+
+    def _draw_narrow(self, text: str) -> None:
+        cursor = self.cursor
+        columns = self.columns
+        attrs = cursor.attrs
+        cells = self._cells.get(attrs)
+        if cells is None:
+            if len(self._cells) > 256:
+                self._cells.clear()
+            cells = self._cells[attrs] = {}
+        for char in set(text).difference(cells):
+            cells[char] = attrs._replace(data=char)
+        chars = list(map(cells.__getitem__, text))
+
+        offset, length = 0, len(text)
+        while offset < length:
+            if cursor.x == columns:
+                self.dirty.add(cursor.y)
+                self.carriage_return()
+                self.linefeed()
+            count = min(columns - cursor.x, length - offset)
+            line = self.buffer[cursor.y]
+            line.update(zip(range(cursor.x, cursor.x + count), chars[offset:offset + count]))
+            cursor.x += count
+            offset += count
+        self.dirty.add(cursor.y)
+
+class FastStream(pyte.Stream):
+    """pyte.Stream that dispatches complete CSI sequences without the parser.
+
+    Plain text runs are handed to the screen's draw in one call (as pyte does)
+    and well-formed ``ESC [ [?] params final`` sequences are dispatched
+    directly. Everything else falls back to pyte's character-by-character
+    parser, including sequences split across two feeds.
+    """
+    _csi_pattern = re.compile(
+        "\x1b\\[(\\??)([0-9;]*)([" + re.escape("".join(pyte.Stream.csi)) + "])")
+
+    def attach(self, screen: pyte.Screen) -> None:
+        super().attach(screen)
+        self._csi_dispatch = {
+            code: getattr(screen, event) for code, event in self.csi.items()}
+
+    def feed(self, data: str) -> None:
+        if self.listener is None:
+            raise RuntimeError("Listener is not set")
+        send = self._send_to_parser
+        draw = self.listener.draw
+        csi_dispatch = self._csi_dispatch
+        match_text = self._text_pattern.match
+        match_csi = self._csi_pattern.match
+        taking_plain_text = self._taking_plain_text
+        length = len(data)
+        offset = 0
+        while offset < length:
+            if taking_plain_text:
+                match = match_text(data, offset)
+                if match:
+                    start, offset = match.span()
+                    draw(data[start:offset])
+                    continue
+                match = match_csi(data, offset)
+                if match:
+                    offset = match.end()
+                    private, params, final = match.groups()
+                    params = [min(int(p or 0), 9999) for p in params.split(";")]
+                    try:
+                        if private:
+                            csi_dispatch[final](*params, private=True)
+                        else:
+                            csi_dispatch[final](*params)
+                    except Exception:
+                        # Same recovery as pyte's _send_to_parser
+                        self._initialize_parser()
+                        raise
+                    continue
+                taking_plain_text = False
+            else:
+                taking_plain_text = send(data[offset:offset + 1])
+                offset += 1
+        self._taking_plain_text = taking_plain_text
+
 # --- GLOBAL STATE ---
 master_fd = None
 slave_fd = None
 process = None
-screen = pyte.Screen(SCREEN_COLS, SCREEN_ROWS)
-stream = pyte.Stream(screen)
+screen = FastScreen(SCREEN_COLS, SCREEN_ROWS)
+stream = FastStream(screen)
 last_output_time = 0
 last_sent_time = 0
 STREAM_MODE = False  # False = Send only at end (Smart Mode) / True = Send constant updates
@@ -88,6 +249,12 @@ TRANSLATIONS = {
         "mode_changed": "Mode changed to: **{}**",
         "language_changed": "🌐 Language changed to: **{}**",
         "invalid_language": "❌ Invalid language. Available: {}",
+        "file_too_large": "❌ File too large ({:.1f} MB). Limit: {:.0f} MB",
+        "file_saved": "📥 File saved: `{}`",
+        "file_error": "❌ Error transferring file: {}",
+        "specify_path": "⚠️ You must specify a path.\nExample: `/get src/main.py`",
+        "file_not_found": "❌ File not found: `{}`",
+        "path_outside_workdir": "❌ Path is outside the working directory: `{}`",
         # Commands descriptions
         "cmd_start": "Start the bot",
         "cmd_help": "See this help",
@@ -101,7 +268,9 @@ TRANSLATIONS = {
         "cmd_model": "Change model (restarts)",
         "cmd_restart": "Restart process",
         "cmd_ctrlc": "Send Interrupt (Ctrl+C)",
-        "cmd_lang": "Change language (en, es, zh)"
+        "cmd_lang": "Change language (en, es, zh)",
+        "cmd_get": "Download a file from the working directory",
+        "cmd_upload": "Send a document or photo to upload it to the working directory"
     },
     "es": {
         "connected": "🚀 Puente Claude Conectado.\nUsa /help para ver comandos.",
@@ -140,6 +309,12 @@ TRANSLATIONS = {
         "mode_changed": "Modo cambiado a: **{}**",
         "language_changed": "🌐 Idioma cambiado a: **{}**",
         "invalid_language": "❌ Idioma inválido. Disponibles: {}",
+        "file_too_large": "❌ Archivo demasiado grande ({:.1f} MB). Límite: {:.0f} MB",
+        "file_saved": "📥 Archivo guardado: `{}`",
+        "file_error": "❌ Error transfiriendo archivo: {}",
+        "specify_path": "⚠️ Debes especificar una ruta.\nEjemplo: `/get src/main.py`",
+        "file_not_found": "❌ Archivo no encontrado: `{}`",
+        "path_outside_workdir": "❌ La ruta está fuera del directorio de trabajo: `{}`",
         # Descriptions
         "cmd_start": "Iniciar el bot",
         "cmd_help": "Ver esta ayuda",
@@ -153,7 +328,9 @@ TRANSLATIONS = {
         "cmd_model": "Cambiar modelo (reinicia)",
         "cmd_restart": "Reiniciar proceso",
         "cmd_ctrlc": "Enviar Interrupción (Ctrl+C)",
-        "cmd_lang": "Cambiar idioma (en, es, zh)"
+        "cmd_lang": "Cambiar idioma (en, es, zh)",
+        "cmd_get": "Descargar un archivo del directorio de trabajo",
+        "cmd_upload": "Envía un documento o foto para subirlo al directorio de trabajo"
     },
     "zh": {
         "connected": "🚀 Claude Bridge 已连接。\n使用 /help 查看命令。",
@@ -192,6 +369,12 @@ TRANSLATIONS = {
         "mode_changed": "模式已更改为: **{}**",
         "language_changed": "🌐 语言已更改为: **{}**",
         "invalid_language": "❌ 无效语言。可用: {}",
+        "file_too_large": "❌ 文件过大 ({:.1f} MB)。限制: {:.0f} MB",
+        "file_saved": "📥 文件已保存: `{}`",
+        "file_error": "❌ 文件传输错误: {}",
+        "specify_path": "⚠️ 必须指定路径。\n示例: `/get src/main.py`",
+        "file_not_found": "❌ 文件未找到: `{}`",
+        "path_outside_workdir": "❌ 路径不在工作目录内: `{}`",
         # Descriptions
         "cmd_start": "启动机器人",
         "cmd_help": "查看此帮助",
@@ -205,7 +388,9 @@ TRANSLATIONS = {
         "cmd_model": "更改模型 (需重启)",
         "cmd_restart": "重启进程",
         "cmd_ctrlc": "发送中断 (Ctrl+C)",
-        "cmd_lang": "更改语言 (en, es, zh)"
+        "cmd_lang": "更改语言 (en, es, zh)",
+        "cmd_get": "从工作目录下载文件",
+        "cmd_upload": "发送文档或图片以上传到工作目录"
     }
 }
 
@@ -269,6 +454,86 @@ async def safe_reply(update: Update, text: str, parse_mode=None):
     except Exception as e:
         print(f"❌ Error replying: {e}")
 
+async def write_to_claude(text: str):
+    """Types text into the Claude prompt and submits it with Enter."""
+    if master_fd:
+        os.write(master_fd, text.encode('utf-8'))
+        await asyncio.sleep(0.1)
+        os.write(master_fd, b'\r')
+        trigger_update()
+
+def resolve_work_path(path: str):
+    """Resolves a user supplied path inside WORK_DIR. Returns None if it escapes it."""
+    root = os.path.realpath(WORK_DIR)
+    full_path = os.path.realpath(os.path.join(root, os.path.expanduser(path)))
+    if os.path.commonpath([root, full_path]) != root:
+        return None
+    return full_path
+
+def unique_upload_path(filename: str):
+    """Returns a free path for filename inside the upload directory."""
+    upload_dir = os.path.join(WORK_DIR, UPLOAD_SUBDIR)
+    os.makedirs(upload_dir, exist_ok=True)
+    name = os.path.basename(filename.replace("\\", "/")) or "upload"
+    if name in (".", ".."):
+        name = "upload"
+    base, ext = os.path.splitext(name)
+    path = os.path.join(upload_dir, name)
+    counter = 1
+    while os.path.exists(path):
+        path = os.path.join(upload_dir, f"{base}_{counter}{ext}")
+        counter += 1
+    return path
+
+async def stream_download(url: str, dest_path: str, max_size: int, transport=None):
+    """Streams url to dest_path in chunks, never holding the whole file in memory.
+
+    Errors are raised as ValueError without the URL, which contains the bot token.
+    """
+    tmp_path = dest_path + ".part"
+    written = 0
+    try:
+        async with httpx.AsyncClient(timeout=60, transport=transport) as client:
+            async with client.stream("GET", url) as response:
+                if response.is_error:
+                    raise ValueError(f"download failed with HTTP {response.status_code}")
+                with open(tmp_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                        written += len(chunk)
+                        if written > max_size:
+                            raise ValueError(f"size limit of {max_size} bytes exceeded")
+                        f.write(chunk)
+        os.replace(tmp_path, dest_path)
+    except httpx.HTTPError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise ValueError(f"download failed ({type(e).__name__})") from None
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return written
+
+def is_text_file(path: str):
+    """Guesses whether a file is text by sniffing its first chunk."""
+    with open(path, "rb") as f:
+        chunk = f.read(8192)
+    if b"\0" in chunk:
+        return False
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(chunk, final=False)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def gzip_to_tempfile(path: str):
+    """Compresses a file chunk by chunk into a spooled temporary file."""
+    tmp = tempfile.SpooledTemporaryFile(max_size=COMPRESS_THRESHOLD)
+    with open(path, "rb") as src, gzip.GzipFile(fileobj=tmp, mode="wb") as gz:
+        shutil.copyfileobj(src, gz, CHUNK_SIZE)
+    tmp.seek(0)
+    return tmp
+
 async def read_from_pty():
     """Reads bytes from process and updates pyte virtual screen."""
     global master_fd, last_output_time
@@ -316,7 +581,7 @@ def start_claude_process():
         except: pass
 
     screen.reset()
-    stream = pyte.Stream(screen)
+    stream = FastStream(screen)
 
     master_fd, slave_fd = pty.openpty()
 
@@ -333,6 +598,7 @@ def start_claude_process():
         stderr=slave_fd,
         preexec_fn=os.setsid,
         universal_newlines=False,
+        cwd=WORK_DIR,
         env=env
     )
     os.close(slave_fd)
@@ -510,6 +776,41 @@ async def toggle_mode(update: Update, context: ContextTypes.DEFAULT_TYPE):
     mode_name = t("mode_streaming") if STREAM_MODE else t("mode_silent")
     await safe_reply(update, t("mode_changed", mode_name), parse_mode="Markdown")
 
+async def get_file_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if update.effective_user.id != ALLOWED_USER_ID: return
+    if not context.args:
+        await safe_reply(update, t("specify_path"), parse_mode="Markdown")
+        return
+    requested = " ".join(context.args)
+    path = resolve_work_path(requested)
+    if path is None:
+        await safe_reply(update, t("path_outside_workdir", requested), parse_mode="Markdown")
+        return
+    if not os.path.isfile(path):
+        await safe_reply(update, t("file_not_found", requested), parse_mode="Markdown")
+        return
+    message = update.effective_message
+    if not message: return
+
+    filename = os.path.basename(path)
+    try:
+        if os.path.getsize(path) > COMPRESS_THRESHOLD and is_text_file(path):
+            loop = asyncio.get_event_loop()
+            document = await loop.run_in_executor(None, gzip_to_tempfile, path)
+            filename += ".gz"
+        else:
+            document = open(path, "rb")
+        with document:
+            size = document.seek(0, os.SEEK_END)
+            document.seek(0)
+            if size > MAX_DOWNLOAD_SIZE:
+                await safe_reply(update, t("file_too_large", size / 1048576, MAX_DOWNLOAD_SIZE / 1048576))
+                return
+            await message.reply_document(document=document, filename=filename)
+    except Exception as e:
+        print(f"Error sending file: {e}")
+        await safe_reply(update, t("file_error", e))
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.effective_user.id != ALLOWED_USER_ID: return
     show_sensitive = False
@@ -530,6 +831,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"/resume [query|list] - {t('cmd_resume')}\n"
         f"/new - {t('cmd_new')}\n"
         f"/language [code] - {t('cmd_lang')}\n"
+        f"/get [path] - {t('cmd_get')}\n"
+        f"📎 {t('cmd_upload')}\n"
     )
     if show_sensitive:
         help_text += (
@@ -553,11 +856,52 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     print(f"Message from {user.first_name} (ID: {user.id}): {message.text}")
 
-    if master_fd:
-        os.write(master_fd, message.text.encode('utf-8'))
-        await asyncio.sleep(0.1)
-        os.write(master_fd, b'\r')
-        trigger_update()
+    await write_to_claude(message.text)
+
+async def handle_file(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    user = update.effective_user
+    if user.id != ALLOWED_USER_ID:
+        print(t("access_denied", user.id))
+        return
+    message = update.message or update.edited_message
+    if not message: return
+
+    if message.document:
+        attachment = message.document
+        filename = attachment.file_name or f"document_{attachment.file_unique_id}"
+    elif message.photo:
+        attachment = message.photo[-1]  # Largest available size
+        filename = f"photo_{attachment.file_unique_id}.jpg"
+    else:
+        return
+
+    if attachment.file_size and attachment.file_size > MAX_UPLOAD_SIZE:
+        await safe_reply(update, t("file_too_large", attachment.file_size / 1048576, MAX_UPLOAD_SIZE / 1048576))
+        return
+
+    print(f"File from {user.first_name} (ID: {user.id}): {filename}")
+
+    dest_path = unique_upload_path(filename)
+    try:
+        tg_file = await attachment.get_file()
+        await stream_download(tg_file.file_path, dest_path, MAX_UPLOAD_SIZE)
+    except (ValueError, OSError) as e:
+        print(f"Error downloading file: {e}")
+        await safe_reply(update, t("file_error", e))
+        return
+    except Exception as e:
+        # Other errors may carry the file URL, which includes the bot token
+        print(f"Error downloading file: {type(e).__name__}")
+        await safe_reply(update, t("file_error", type(e).__name__))
+        return
+
+    rel_path = os.path.relpath(dest_path, WORK_DIR)
+    await safe_reply(update, t("file_saved", rel_path), parse_mode="Markdown")
+
+    reference = f"[File: {rel_path}]"
+    if message.caption:
+        reference = f"{message.caption} {reference}"
+    await write_to_claude(reference)
 
 def main():
     global process, master_fd
@@ -585,8 +929,10 @@ def main():
     application.add_handler(CommandHandler("new", new_session_command))
     application.add_handler(CommandHandler("language", change_language))
     application.add_handler(CommandHandler("lang", change_language))
+    application.add_handler(CommandHandler("get", get_file_command))
 
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(filters.Document.ALL | filters.PHOTO, handle_file))
 
     loop = asyncio.get_event_loop()
     loop.create_task(read_from_pty())
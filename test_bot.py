@@ -83,3 +83,169 @@ async def test_safe_reply_logic():
         await safe_reply(update, "hola")
     except Exception:
         pytest.fail("safe_reply crasheó con effective_message=None")
+
+@pytest.mark.asyncio
+async def test_get_file_rejects_path_outside_workdir(tmp_path):
+    """Verifica que /get no sirve archivos fuera del directorio de trabajo"""
+    update = MagicMock(spec=Update)
+    update.effective_user.id = ALLOWED_USER_ID
+    mock_message = AsyncMock(spec=Message)
+    update.effective_message = mock_message
+
+    context = MagicMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = ["../secreto.txt"]
+
+    with patch('telebot.WORK_DIR', str(tmp_path / "proyecto")):
+        await telebot.get_file_command(update, context)
+
+    mock_message.reply_document.assert_not_called()
+    assert mock_message.reply_text.call_count == 1
+
+@pytest.mark.asyncio
+async def test_get_file_compresses_large_text(tmp_path):
+    """Verifica que /get envía comprimidos los archivos de texto grandes"""
+    import gzip
+    contenido = b"linea de log\n" * 200000
+    (tmp_path / "salida.log").write_bytes(contenido)
+
+    update = MagicMock(spec=Update)
+    update.effective_user.id = ALLOWED_USER_ID
+    mock_message = AsyncMock(spec=Message)
+    update.effective_message = mock_message
+
+    enviado = {}
+    async def fake_reply_document(document, filename):
+        enviado["filename"] = filename
+        enviado["data"] = document.read()
+    mock_message.reply_document.side_effect = fake_reply_document
+
+    context = MagicMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = ["salida.log"]
+
+    with patch('telebot.WORK_DIR', str(tmp_path)):
+        await telebot.get_file_command(update, context)
+
+    assert enviado["filename"] == "salida.log.gz"
+    assert gzip.decompress(enviado["data"]) == contenido
+
+@pytest.mark.asyncio
+async def test_handle_file_saves_and_references(tmp_path):
+    """Verifica que un documento subido se guarda y Claude recibe la ruta"""
+    update = MagicMock(spec=Update)
+    update.effective_user.id = ALLOWED_USER_ID
+    update.effective_message = AsyncMock(spec=Message)
+
+    mock_message = MagicMock(spec=Message)
+    mock_message.document.file_name = "error.log"
+    mock_message.document.file_size = 10
+    mock_message.document.get_file = AsyncMock(return_value=MagicMock(file_path="https://example.invalid/error.log"))
+    mock_message.caption = "revisa esto"
+    update.message = mock_message
+
+    context = MagicMock(spec=ContextTypes.DEFAULT_TYPE)
+
+    with patch('telebot.WORK_DIR', str(tmp_path)), \
+         patch('telebot.stream_download', new_callable=AsyncMock) as mock_download, \
+         patch('telebot.write_to_claude', new_callable=AsyncMock) as mock_write:
+        await telebot.handle_file(update, context)
+
+    destino = mock_download.call_args[0][1]
+    assert destino == str(tmp_path / "telegram_uploads" / "error.log")
+    mock_write.assert_called_once_with("revisa esto [File: telegram_uploads/error.log]")
+
+@pytest.mark.asyncio
+async def test_stream_download_writes_in_chunks(tmp_path):
+    """Verifica que stream_download guarda el contenido completo por trozos"""
+    import httpx
+    contenido = bytes(range(256)) * 40
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=contenido))
+    destino = str(tmp_path / "datos.bin")
+
+    with patch('telebot.CHUNK_SIZE', 1000):
+        escritos = await telebot.stream_download("https://example.invalid/datos.bin", destino, 1024 * 1024, transport=transport)
+
+    assert escritos == len(contenido)
+    assert (tmp_path / "datos.bin").read_bytes() == contenido
+    assert not (tmp_path / "datos.bin.part").exists()
+
+@pytest.mark.asyncio
+async def test_stream_download_aborts_when_too_large(tmp_path):
+    """Verifica que una descarga demasiado grande se aborta sin dejar archivos"""
+    import httpx
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, content=b"x" * 5000))
+    destino = str(tmp_path / "grande.bin")
+
+    with patch('telebot.CHUNK_SIZE', 1000), pytest.raises(ValueError):
+        await telebot.stream_download("https://example.invalid/grande.bin", destino, 2500, transport=transport)
+
+    assert not (tmp_path / "grande.bin").exists()
+    assert not (tmp_path / "grande.bin.part").exists()
+
+@pytest.mark.asyncio
+async def test_stream_download_error_hides_url(tmp_path):
+    """Verifica que los errores HTTP no incluyen la URL con el token del bot"""
+    import httpx
+    transport = httpx.MockTransport(lambda request: httpx.Response(404))
+    url = "https://api.telegram.org/file/bot123:SECRETO/documents/file_1.log"
+
+    with pytest.raises(ValueError) as excinfo:
+        await telebot.stream_download(url, str(tmp_path / "file_1.log"), 1024, transport=transport)
+
+    assert "SECRETO" not in str(excinfo.value)
+    assert "404" in str(excinfo.value)
+    assert not (tmp_path / "file_1.log.part").exists()
+
+def _screen_state(screen):
+    """Estado completo de la pantalla para comparar byte a byte"""
+    return (
+        {y: dict(line) for y, line in screen.buffer.items()},
+        screen.cursor.x, screen.cursor.y, screen.cursor.attrs, screen.cursor.hidden,
+        screen.dirty, screen.mode, screen.margins, screen.title, screen.icon_name,
+    )
+
+def _feed_both(chunks):
+    import pyte
+    reference = pyte.Screen(telebot.SCREEN_COLS, telebot.SCREEN_ROWS)
+    fast = telebot.FastScreen(telebot.SCREEN_COLS, telebot.SCREEN_ROWS)
+    reference_stream = pyte.Stream(reference)
+    fast_stream = telebot.FastStream(fast)
+    for chunk in chunks:
+        errors = []
+        for stream in (reference_stream, fast_stream):
+            try:
+                stream.feed(chunk)
+                errors.append(None)
+            except Exception as e:
+                errors.append(type(e))
+        assert errors[0] == errors[1]
+        assert _screen_state(fast) == _screen_state(reference)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_fast_stream_matches_pyte_on_transcripts(seed):
+    """Verifica que FastStream deja la pantalla idéntica a pyte.Stream"""
+    from bench_stream import build_transcript, split_chunks
+    transcript = build_transcript(lines=400, seed=seed)
+    _feed_both(split_chunks(transcript, seed=seed, max_size=64 if seed % 2 else 1024))
+
+@pytest.mark.parametrize("data", [
+    "\x1b[38;5;1" + "74mhola\x1b[0m",  # Secuencia partida entre lecturas
+    "a" * 119 + "\x1b[1mbc" + "d" * 250,  # Salto de línea exacto en la última columna
+    "\x1b[?7l" + "x" * 300 + "\x1b[?7h",  # Sin autowrap
+    "\x1b[4h" + "insert" + "\x1b[4l" + "\r" + "replace",  # Modo inserción
+    "antes\u200bdespués",  # Carácter no imprimible corta el dibujo
+    "\r\n\u0301e\u0301─╭╮✻⏺ 漢字 🎉",  # Combinantes, anchos y cajas
+    "\x1b[40;1H" + "\n" * 5 + "abajo\x1b[m\x1b[?25l\x1b[H\x1b[2J",  # Scroll y CSI sin parámetros
+    "\x1b[5;120H\x1b[?1;2;3m\x1b[99999Cfin\x1b[3X\x1b[2@",  # Parámetros privados y límites
+])
+def test_fast_stream_matches_pyte_edge_cases(data):
+    """Verifica casos límite del camino rápido contra pyte.Stream"""
+    _feed_both([data[:len(data) // 2], data[len(data) // 2:]])
+    _feed_both(list(data))
+
+@pytest.mark.parametrize("chunks", [
+    ["\x1b", "7\x1b[1;2;3H", "\x18x"],  # CUP malformado lanza TypeError
+    ["\x1b", "✻\x1b[?m", "\x18x"],  # Handler que no acepta private=True
+])
+def test_fast_stream_matches_pyte_after_handler_error(chunks):
+    """Verifica que tras un error en un handler CSI el parser se reinicia igual que en pyte"""
+    _feed_both(chunks)